@@ -0,0 +1,70 @@
+from dataclasses import dataclass, field
+from typing import Optional, Set
+from datetime import datetime
+import secrets
+
+@dataclass
+class FileTransfer:
+    transfer_id: str
+    sender: str
+    recipient: str
+    filename: str
+    size: int
+    chunk_size: int
+    mime_type: Optional[str] = None
+    # Socket IDs currently bound to each side; None while that side is disconnected
+    sender_sid: Optional[str] = None
+    recipient_sid: Optional[str] = None
+    # Secrets handed to each side so only they can reclaim a paused transfer
+    sender_token: str = field(default_factory=lambda: secrets.token_urlsafe(16), repr=False)
+    recipient_token: str = field(default_factory=lambda: secrets.token_urlsafe(16), repr=False)
+    accepted: bool = False
+    paused: bool = False
+    # Number of chunks the recipient has acknowledged (all chunks below this index)
+    acked_chunks: int = 0
+    # Indices at or above acked_chunks that have been relayed but not yet acknowledged
+    reserved_chunks: Set[int] = field(default_factory=set)
+    last_activity: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    @property
+    def next_chunk(self) -> int:
+        return max(self.reserved_chunks) + 1 if self.reserved_chunks else self.acked_chunks
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.reserved_chunks)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.acked_chunks >= self.total_chunks
+
+    def peer_sid(self, sid: str) -> Optional[str]:
+        """Socket ID of the other side of the transfer, if it is connected"""
+        for other in (self.sender_sid, self.recipient_sid):
+            if other and other != sid:
+                return other
+        return None
+
+    def expected_chunk_length(self, index: int) -> int:
+        """Byte length a chunk at the given index must have"""
+        if index == self.total_chunks - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    def to_dict(self):
+        return {
+            'transferId': self.transfer_id,
+            'from': self.sender,
+            'to': self.recipient,
+            'filename': self.filename,
+            'size': self.size,
+            'mimeType': self.mime_type,
+            'chunkSize': self.chunk_size,
+            'totalChunks': self.total_chunks,
+            'ackedChunks': self.acked_chunks,
+            'paused': self.paused
+        }
@@ -0,0 +1,236 @@
+from threading import Lock
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import hmac
+import uuid
+
+from ..models.transfer import FileTransfer
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_FILE_SIZE = 100 * 1024 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Maximum number of relayed but unacknowledged chunks per transfer
+WINDOW_SIZE = 8
+MAX_TRANSFERS_PER_USER = 5
+# Offers a single user may have pending or in progress as the recipient
+MAX_INCOMING_TRANSFERS_PER_USER = 10
+# Seconds between sweeps for idle or abandoned transfers
+CLEANUP_INTERVAL = 60
+# Seconds without activity after which a transfer is dropped
+IDLE_TIMEOUT = 600
+MAX_FILENAME_LENGTH = 255
+MAX_MIME_TYPE_LENGTH = 127
+# Total size of all outgoing transfers a single user may have open at once
+MAX_PENDING_BYTES_PER_USER = 250 * 1024 * 1024
+
+
+class TransferError(Exception):
+    """Raised when a transfer operation is rejected"""
+
+
+class TransferManager:
+    def __init__(self):
+        self.transfers: Dict[str, FileTransfer] = {}
+        self.lock = Lock()
+
+    def create_transfer(self, sender: str, sender_sid: str, recipient: str, recipient_sid: str,
+                        filename: str, size, chunk_size=DEFAULT_CHUNK_SIZE,
+                        mime_type: Optional[str] = None) -> FileTransfer:
+        """Register a new transfer offer after enforcing size quotas"""
+        if sender == recipient or sender_sid == recipient_sid:
+            raise TransferError('Cannot send a file to yourself')
+        if not isinstance(filename, str) or not 0 < len(filename) <= MAX_FILENAME_LENGTH:
+            raise TransferError(f'Filename must be 1-{MAX_FILENAME_LENGTH} characters')
+        if mime_type is not None and (not isinstance(mime_type, str) or len(mime_type) > MAX_MIME_TYPE_LENGTH):
+            raise TransferError('Invalid MIME type')
+        if not self._is_int(size) or size <= 0:
+            raise TransferError('Invalid file size')
+        if size > MAX_FILE_SIZE:
+            raise TransferError(f'File exceeds maximum size of {MAX_FILE_SIZE} bytes')
+        if not self._is_int(chunk_size) or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise TransferError(f'Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes')
+
+        with self.lock:
+            outgoing = [t for t in self.transfers.values() if t.sender == sender]
+            if len(outgoing) >= MAX_TRANSFERS_PER_USER:
+                raise TransferError('Too many active transfers')
+            if sum(t.size for t in outgoing) + size > MAX_PENDING_BYTES_PER_USER:
+                raise TransferError('Transfer quota exceeded')
+            incoming = sum(1 for t in self.transfers.values() if t.recipient == recipient)
+            if incoming >= MAX_INCOMING_TRANSFERS_PER_USER:
+                raise TransferError('Recipient has too many pending transfers')
+
+            transfer = FileTransfer(
+                transfer_id=uuid.uuid4().hex,
+                sender=sender,
+                recipient=recipient,
+                filename=filename,
+                size=size,
+                chunk_size=chunk_size,
+                mime_type=mime_type,
+                sender_sid=sender_sid,
+                recipient_sid=recipient_sid
+            )
+            self.transfers[transfer.transfer_id] = transfer
+            logger.info(f"Transfer {transfer.transfer_id} offered: {sender} -> {recipient} ({size} bytes)")
+            return transfer
+
+    def get_transfer(self, transfer_id: str) -> Optional[FileTransfer]:
+        """Get transfer by ID"""
+        with self.lock:
+            return self.transfers.get(transfer_id)
+
+    def accept_transfer(self, transfer_id: str, sid: str) -> FileTransfer:
+        """Mark a transfer as accepted by its recipient"""
+        with self.lock:
+            transfer = self._get_for_participant(transfer_id, sid)
+            if transfer.recipient_sid != sid:
+                raise TransferError('Only the recipient can accept a transfer')
+            transfer.accepted = True
+            transfer.last_activity = datetime.utcnow()
+            return transfer
+
+    def reserve_chunk(self, transfer_id: str, sid: str, index, length: int) -> FileTransfer:
+        """Validate an incoming chunk against the window and size limits
+
+        Chunk events for one transfer may be handled concurrently, so any index
+        not yet relayed within the window is accepted rather than only the next one.
+        """
+        with self.lock:
+            transfer = self._get_for_participant(transfer_id, sid)
+            if transfer.sender_sid != sid:
+                raise TransferError('Only the sender can send chunks')
+            if not transfer.accepted:
+                raise TransferError('Transfer has not been accepted')
+            if transfer.paused:
+                raise TransferError('Transfer is paused')
+            if not self._is_int(index) or not 0 <= index < transfer.total_chunks:
+                raise TransferError('Chunk index out of range')
+            if index < transfer.acked_chunks or index in transfer.reserved_chunks:
+                raise TransferError(f'Chunk {index} was already sent')
+            if index >= transfer.acked_chunks + WINDOW_SIZE:
+                raise TransferError('Flow control window is full')
+            if length != transfer.expected_chunk_length(index):
+                raise TransferError('Invalid chunk length')
+
+            transfer.reserved_chunks.add(index)
+            transfer.last_activity = datetime.utcnow()
+            return transfer
+
+    def acknowledge_chunk(self, transfer_id: str, sid: str, index) -> FileTransfer:
+        """Record a cumulative acknowledgement; completed transfers are removed"""
+        with self.lock:
+            transfer = self._get_for_participant(transfer_id, sid)
+            if transfer.recipient_sid != sid:
+                raise TransferError('Only the recipient can acknowledge chunks')
+            # Acknowledgements are cumulative, so every chunk up to index must have been relayed
+            if not self._is_int(index) or index < transfer.acked_chunks or not all(
+                i in transfer.reserved_chunks for i in range(transfer.acked_chunks, index + 1)
+            ):
+                raise TransferError('Invalid acknowledgement')
+
+            transfer.reserved_chunks.difference_update(range(transfer.acked_chunks, index + 1))
+            transfer.acked_chunks = index + 1
+            transfer.last_activity = datetime.utcnow()
+            if transfer.is_complete:
+                del self.transfers[transfer_id]
+                logger.info(f"Transfer {transfer_id} completed")
+            return transfer
+
+    def resume_transfer(self, transfer_id: str, sid: str, nickname: str, token) -> FileTransfer:
+        """Rebind the side owning the resume token to this socket and rewind to the last acknowledged chunk
+
+        The transfer stays paused until both sides are bound to a live socket.
+        """
+        with self.lock:
+            transfer = self.transfers.get(transfer_id)
+            role = self._match_token(transfer, token) if transfer else None
+            if not role:
+                raise TransferError('Transfer not found')
+            if not transfer.accepted:
+                raise TransferError('Transfer has not been accepted')
+
+            if role == 'sender':
+                transfer.sender, transfer.sender_sid = nickname, sid
+            else:
+                transfer.recipient, transfer.recipient_sid = nickname, sid
+            transfer.reserved_chunks.clear()
+            transfer.paused = not (transfer.sender_sid and transfer.recipient_sid)
+            transfer.last_activity = datetime.utcnow()
+            logger.info(f"Transfer {transfer_id} {role} reattached at chunk {transfer.acked_chunks}")
+            return transfer
+
+    def cancel_transfer(self, transfer_id: str, sid: str, token=None) -> FileTransfer:
+        """Remove a transfer on behalf of a socket still bound to it or the holder of a resume token"""
+        with self.lock:
+            transfer = self.transfers.get(transfer_id)
+            if not transfer:
+                raise TransferError('Transfer not found')
+            if sid not in (transfer.sender_sid, transfer.recipient_sid) and not self._match_token(transfer, token):
+                raise TransferError('Transfer not found')
+
+            del self.transfers[transfer_id]
+            logger.info(f"Transfer {transfer_id} cancelled")
+            return transfer
+
+    def pause_user_transfers(self, sid: str) -> List[FileTransfer]:
+        """Unbind a disconnected socket, pausing accepted transfers and dropping unaccepted offers"""
+        with self.lock:
+            affected = []
+            if not sid:
+                return affected
+            for transfer_id, transfer in list(self.transfers.items()):
+                if sid not in (transfer.sender_sid, transfer.recipient_sid):
+                    continue
+                if transfer.accepted:
+                    if transfer.sender_sid == sid:
+                        transfer.sender_sid = None
+                    else:
+                        transfer.recipient_sid = None
+                    transfer.paused = True
+                    transfer.reserved_chunks.clear()
+                    transfer.last_activity = datetime.utcnow()
+                else:
+                    del self.transfers[transfer_id]
+                affected.append(transfer)
+            return affected
+
+    def cleanup_stale_transfers(self, max_idle_time: int = IDLE_TIMEOUT) -> List[FileTransfer]:
+        """Remove transfers without activity and return them"""
+        with self.lock:
+            now = datetime.utcnow()
+            stale = [
+                transfer for transfer in self.transfers.values()
+                if (now - transfer.last_activity) > timedelta(seconds=max_idle_time)
+            ]
+            for transfer in stale:
+                del self.transfers[transfer.transfer_id]
+
+            if stale:
+                logger.info(f"Cleaned up {len(stale)} stale transfers")
+            return stale
+
+    def _get_for_participant(self, transfer_id: str, sid: str) -> FileTransfer:
+        transfer = self.transfers.get(transfer_id)
+        if not transfer or sid not in (transfer.sender_sid, transfer.recipient_sid):
+            raise TransferError('Transfer not found')
+        return transfer
+
+    @staticmethod
+    def _is_int(value) -> bool:
+        # Reject bools and floats that would otherwise compare equal to an int
+        return type(value) is int
+
+    @staticmethod
+    def _match_token(transfer: FileTransfer, token) -> Optional[str]:
+        if not isinstance(token, str):
+            return None
+        token = token.encode()
+        if hmac.compare_digest(token, transfer.sender_token.encode()):
+            return 'sender'
+        if hmac.compare_digest(token, transfer.recipient_token.encode()):
+            return 'recipient'
+        return None
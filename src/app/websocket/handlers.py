@@ -3,10 +3,13 @@ from flask_socketio import emit
 import re
 
 from ..services.chat_manager import ChatManager
+from ..services.transfer_manager import TransferManager
+from .transfer_handlers import pause_participant_transfers, register_transfer_handlers
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 chat_manager = ChatManager()
+transfer_manager = TransferManager()
 
 def register_handlers(socketio):
     @socketio.on('connect')
@@ -53,6 +56,9 @@ def register_handlers(socketio):
             if target_user:
                 emit('end_call', {'from': user.nickname}, room=target_user.sid)
 
+        if user:
+            pause_participant_transfers(transfer_manager, request.sid, user.nickname)
+
         chat_manager.remove_user(request.sid)
         emit('update_users', chat_manager.get_user_list(), broadcast=True)
 
@@ -105,4 +111,7 @@ def register_handlers(socketio):
 
     # Register call-related handlers
     from .call_handlers import register_call_handlers
-    register_call_handlers(socketio, chat_manager)
\ No newline at end of file
+    register_call_handlers(socketio, chat_manager)
+
+    # Register file transfer handlers
+    register_transfer_handlers(socketio, chat_manager, transfer_manager)
\ No newline at end of file
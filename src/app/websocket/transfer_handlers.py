@@ -0,0 +1,225 @@
+from flask import request
+from flask_socketio import emit
+
+from ..services.transfer_manager import (
+    TransferError, CLEANUP_INTERVAL, DEFAULT_CHUNK_SIZE, IDLE_TIMEOUT, WINDOW_SIZE
+)
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def emit_to(sid, event, payload):
+    """Emit to a single transfer participant, skipping sides that are not bound
+
+    emit() with room=None would broadcast to every connected client.
+    """
+    if sid:
+        emit(event, payload, room=sid)
+
+def cancelled_payload(transfer, nickname, reason):
+    """file_cancelled payload; reason is 'cancelled', 'disconnected' or 'expired'
+
+    nickname is the side that ended the transfer, or None when it expired.
+    """
+    return {
+        'transferId': transfer.transfer_id,
+        'from': nickname,
+        'reason': reason
+    }
+
+def pause_participant_transfers(transfer_manager, sid, nickname):
+    """Pause transfers of a departed socket and tell the other sides"""
+    # Keep accepted transfers around so they can resume from the last acknowledged chunk
+    for transfer in transfer_manager.pause_user_transfers(sid):
+        peer_sid = transfer.peer_sid(sid)
+        if transfer.accepted:
+            emit_to(peer_sid, 'file_paused', {
+                'transferId': transfer.transfer_id,
+                'from': nickname
+            })
+        else:
+            emit_to(peer_sid, 'file_cancelled', cancelled_payload(transfer, nickname, 'disconnected'))
+
+def expire_stale_transfers(socketio, transfer_manager, max_idle_time=IDLE_TIMEOUT):
+    """Drop idle transfers and notify any side still connected; returns the dropped transfers"""
+    expired = transfer_manager.cleanup_stale_transfers(max_idle_time)
+    for transfer in expired:
+        for sid in (transfer.sender_sid, transfer.recipient_sid):
+            if sid:
+                socketio.emit('file_cancelled', cancelled_payload(transfer, None, 'expired'), room=sid)
+    return expired
+
+def register_transfer_handlers(socketio, chat_manager, transfer_manager):
+    def run_transfer_expiry():
+        """Periodically drop idle transfers so they stop counting against quotas"""
+        while True:
+            socketio.sleep(CLEANUP_INTERVAL)
+            try:
+                expire_stale_transfers(socketio, transfer_manager)
+            except Exception as e:
+                logger.error(f"Error expiring transfers: {e}")
+
+    socketio.start_background_task(run_transfer_expiry)
+
+    @socketio.on('file_offer')
+    def handle_file_offer(data):
+        try:
+            sender = chat_manager.get_user_by_sid(request.sid)
+            if not sender:
+                emit('error', {'message': 'User not found'}, room=request.sid)
+                return
+
+            target = data.get('to')
+            filename = data.get('filename')
+            if not all([target, filename]):
+                emit('error', {'message': 'Invalid file offer data'}, room=request.sid)
+                return
+
+            target_user = chat_manager.get_user(target)
+            if not target_user:
+                emit('error', {'message': 'Recipient not found'}, room=request.sid)
+                return
+
+            transfer = transfer_manager.create_transfer(
+                sender.nickname,
+                request.sid,
+                target_user.nickname,
+                target_user.sid,
+                filename,
+                data.get('size'),
+                chunk_size=data.get('chunkSize', DEFAULT_CHUNK_SIZE),
+                mime_type=data.get('mimeType')
+            )
+
+            emit('file_offer_created', {
+                **transfer.to_dict(),
+                'resumeToken': transfer.sender_token
+            }, room=request.sid)
+            emit('file_offer', {
+                **transfer.to_dict(),
+                'resumeToken': transfer.recipient_token,
+                'timestamp': data.get('timestamp')
+            }, room=target_user.sid)
+        except TransferError as e:
+            emit('error', {'message': str(e)}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_offer: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
+
+    @socketio.on('file_accept')
+    def handle_file_accept(data):
+        try:
+            transfer_id = data.get('transferId')
+            if not transfer_id:
+                emit('error', {'message': 'Invalid file accept data'}, room=request.sid)
+                return
+
+            transfer = transfer_manager.accept_transfer(transfer_id, request.sid)
+            emit_to(transfer.sender_sid, 'file_accepted', {
+                'transferId': transfer.transfer_id,
+                'from': transfer.recipient,
+                'window': WINDOW_SIZE
+            })
+        except TransferError as e:
+            emit('error', {'message': str(e), 'transferId': data.get('transferId')}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_accept: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
+
+    @socketio.on('file_chunk')
+    def handle_file_chunk(data):
+        try:
+            transfer_id = data.get('transferId')
+            chunk = data.get('chunk')
+            if not transfer_id or not isinstance(chunk, (bytes, bytearray)):
+                emit('error', {'message': 'Invalid file chunk data'}, room=request.sid)
+                return
+
+            # Binary attachments arrive as raw bytes and the same object is
+            # relayed as a binary attachment, so it is never base64-encoded
+            index = data.get('index')
+            transfer = transfer_manager.reserve_chunk(transfer_id, request.sid, index, len(chunk))
+
+            # A disconnect racing this relay unbinds the recipient and rewinds the
+            # transfer itself, so an unbound recipient is simply skipped
+            emit_to(transfer.recipient_sid, 'file_chunk', {
+                'transferId': transfer.transfer_id,
+                'from': transfer.sender,
+                'index': index,
+                'chunk': chunk
+            })
+        except TransferError as e:
+            emit('error', {'message': str(e), 'transferId': data.get('transferId')}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_chunk: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
+
+    @socketio.on('file_chunk_ack')
+    def handle_file_chunk_ack(data):
+        try:
+            transfer_id = data.get('transferId')
+            if not transfer_id:
+                emit('error', {'message': 'Invalid acknowledgement data'}, room=request.sid)
+                return
+
+            transfer = transfer_manager.acknowledge_chunk(transfer_id, request.sid, data.get('index'))
+            if transfer.is_complete:
+                emit('file_complete', {'transferId': transfer.transfer_id}, room=request.sid)
+                emit_to(transfer.sender_sid, 'file_complete', {'transferId': transfer.transfer_id})
+            else:
+                emit_to(transfer.sender_sid, 'file_chunk_ack', {
+                    'transferId': transfer.transfer_id,
+                    'ackedChunks': transfer.acked_chunks
+                })
+        except TransferError as e:
+            emit('error', {'message': str(e), 'transferId': data.get('transferId')}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_chunk_ack: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
+
+    @socketio.on('file_resume')
+    def handle_file_resume(data):
+        try:
+            user = chat_manager.get_user_by_sid(request.sid)
+            transfer_id = data.get('transferId')
+            if not all([user, transfer_id]):
+                emit('error', {'message': 'Invalid resume data'}, room=request.sid)
+                return
+
+            transfer = transfer_manager.resume_transfer(
+                transfer_id, request.sid, user.nickname, data.get('resumeToken')
+            )
+            if transfer.paused:
+                # The other side has not reattached yet; it resumes once they do
+                emit('file_paused', {
+                    'transferId': transfer.transfer_id,
+                    'ackedChunks': transfer.acked_chunks
+                }, room=request.sid)
+                return
+
+            payload = {**transfer.to_dict(), 'nextChunk': transfer.next_chunk}
+            emit_to(transfer.sender_sid, 'file_resume', payload)
+            emit_to(transfer.recipient_sid, 'file_resume', payload)
+        except TransferError as e:
+            emit('error', {'message': str(e), 'transferId': data.get('transferId')}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_resume: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
+
+    @socketio.on('file_cancel')
+    def handle_file_cancel(data):
+        try:
+            user = chat_manager.get_user_by_sid(request.sid)
+            transfer_id = data.get('transferId')
+            if not all([user, transfer_id]):
+                emit('error', {'message': 'Invalid cancel data'}, room=request.sid)
+                return
+
+            transfer = transfer_manager.cancel_transfer(transfer_id, request.sid, data.get('resumeToken'))
+            emit_to(transfer.peer_sid(request.sid), 'file_cancelled',
+                    cancelled_payload(transfer, user.nickname, 'cancelled'))
+        except TransferError as e:
+            emit('error', {'message': str(e), 'transferId': data.get('transferId')}, room=request.sid)
+        except Exception as e:
+            logger.error(f"Error in file_cancel: {e}")
+            emit('error', {'message': 'Server error'}, room=request.sid)
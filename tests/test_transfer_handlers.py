@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_socketio import SocketIO
+
+from app.services.chat_manager import ChatManager
+from app.services.transfer_manager import TransferManager
+from app.websocket import handlers
+from app.websocket.transfer_handlers import expire_stale_transfers
+
+
+@pytest.fixture
+def socketio(monkeypatch):
+    monkeypatch.setattr(handlers, 'chat_manager', ChatManager())
+    monkeypatch.setattr(handlers, 'transfer_manager', TransferManager())
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    handlers.register_handlers(socketio)
+    socketio.test_app = app
+    return socketio
+
+
+@pytest.fixture
+def connect(socketio):
+    def connect(nickname):
+        client = socketio.test_client(socketio.test_app)
+        client.emit('set_nickname', {'nickname': nickname})
+        client.get_received()
+        return client
+    return connect
+
+
+def received(client, name):
+    return [packet['args'][0] for packet in client.get_received() if packet['name'] == name]
+
+
+def sid_of(nickname):
+    return handlers.chat_manager.get_user(nickname).sid
+
+
+def start_transfer(sender, recipient, to, size=10, chunk_size=4):
+    sender.emit('file_offer', {'to': to, 'filename': 'file.bin', 'size': size, 'chunkSize': chunk_size})
+    created = received(sender, 'file_offer_created')[0]
+    offer = received(recipient, 'file_offer')[0]
+    recipient.emit('file_accept', {'transferId': offer['transferId']})
+    sender.get_received()
+    return created, offer
+
+
+def test_offer_hands_each_side_its_own_token(connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    created, offer = start_transfer(alice, bobby, 'bobby')
+
+    transfer = handlers.transfer_manager.get_transfer(created['transferId'])
+    assert created['resumeToken'] == transfer.sender_token
+    assert offer['resumeToken'] == transfer.recipient_token
+    assert created['resumeToken'] != offer['resumeToken']
+
+
+def test_chunks_relayed_to_recipient_only(connect):
+    alice, bobby, carol = connect('alice'), connect('bobby'), connect('carol')
+    created, _ = start_transfer(alice, bobby, 'bobby')
+    transfer_id = created['transferId']
+
+    alice.emit('file_chunk', {'transferId': transfer_id, 'index': 1, 'chunk': b'efgh'})
+    alice.emit('file_chunk', {'transferId': transfer_id, 'index': 0, 'chunk': b'abcd'})
+    chunks = received(bobby, 'file_chunk')
+    assert [(c['index'], c['chunk']) for c in chunks] == [(1, b'efgh'), (0, b'abcd')]
+    assert not received(carol, 'file_chunk')
+
+    bobby.emit('file_chunk_ack', {'transferId': transfer_id, 'index': 1})
+    assert received(alice, 'file_chunk_ack') == [{'transferId': transfer_id, 'ackedChunks': 2}]
+
+    alice.emit('file_chunk', {'transferId': transfer_id, 'index': 2, 'chunk': b'ij'})
+    bobby.get_received()
+    bobby.emit('file_chunk_ack', {'transferId': transfer_id, 'index': 2})
+    assert received(alice, 'file_complete') == [{'transferId': transfer_id}]
+    assert received(bobby, 'file_complete') == [{'transferId': transfer_id}]
+    assert handlers.transfer_manager.get_transfer(transfer_id) is None
+
+
+def test_disconnect_pauses_and_token_resumes(connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    created, offer = start_transfer(alice, bobby, 'bobby')
+    transfer_id = created['transferId']
+    alice.emit('file_chunk', {'transferId': transfer_id, 'index': 0, 'chunk': b'abcd'})
+    bobby.emit('file_chunk_ack', {'transferId': transfer_id, 'index': 0})
+    alice.get_received()
+
+    bobby.disconnect()
+    assert received(alice, 'file_paused') == [{'transferId': transfer_id, 'from': 'bobby'}]
+
+    # Someone reusing the nickname cannot reclaim the transfer
+    impostor = connect('bobby')
+    impostor.emit('file_resume', {'transferId': transfer_id})
+    impostor.emit('file_cancel', {'transferId': transfer_id})
+    assert [e['message'] for e in received(impostor, 'error')] == ['Transfer not found'] * 2
+    impostor.disconnect()
+
+    bobby = connect('bobby')
+    bobby.emit('file_resume', {'transferId': transfer_id, 'resumeToken': offer['resumeToken']})
+    for client in (alice, bobby):
+        resumed = received(client, 'file_resume')
+        assert len(resumed) == 1
+        assert resumed[0]['nextChunk'] == resumed[0]['ackedChunks'] == 1
+
+
+def test_bound_sender_cancels_paused_transfer(connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    created, _ = start_transfer(alice, bobby, 'bobby')
+    transfer_id = created['transferId']
+
+    bobby.disconnect()
+    assert received(alice, 'file_paused')
+    alice.emit('file_cancel', {'transferId': transfer_id})
+    assert not received(alice, 'error')
+    assert handlers.transfer_manager.get_transfer(transfer_id) is None
+
+
+def test_cancel_notifies_peer(connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    created, _ = start_transfer(alice, bobby, 'bobby')
+
+    bobby.emit('file_cancel', {'transferId': created['transferId']})
+    assert received(alice, 'file_cancelled') == [
+        {'transferId': created['transferId'], 'from': 'bobby', 'reason': 'cancelled'}
+    ]
+
+
+def test_disconnect_drops_unaccepted_offer(connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    alice.emit('file_offer', {'to': 'bobby', 'filename': 'file.bin', 'size': 10})
+    transfer_id = received(alice, 'file_offer_created')[0]['transferId']
+
+    alice.disconnect()
+    assert received(bobby, 'file_cancelled') == [
+        {'transferId': transfer_id, 'from': 'alice', 'reason': 'disconnected'}
+    ]
+
+
+def test_chunk_racing_disconnect_does_not_notify_unrelated_peers(connect, monkeypatch):
+    alice, bobby, carol, dave = connect('alice'), connect('bobby'), connect('carol'), connect('dave')
+    created, _ = start_transfer(alice, bobby, 'bobby')
+    other, _ = start_transfer(carol, dave, 'dave')
+    dave.disconnect()
+    carol.get_received()
+    other_transfer = handlers.transfer_manager.get_transfer(other['transferId'])
+    other_activity = other_transfer.last_activity
+
+    manager = handlers.transfer_manager
+    reserve_chunk = manager.reserve_chunk
+    bobby_sid = sid_of('bobby')
+
+    def reserve_then_disconnect(*args, **kwargs):
+        # The recipient's disconnect lands between reserving and relaying the chunk
+        transfer = reserve_chunk(*args, **kwargs)
+        manager.pause_user_transfers(bobby_sid)
+        handlers.chat_manager.remove_user(bobby_sid)
+        return transfer
+
+    monkeypatch.setattr(manager, 'reserve_chunk', reserve_then_disconnect)
+    alice.emit('file_chunk', {'transferId': created['transferId'], 'index': 0, 'chunk': b'abcd'})
+
+    assert not received(carol, 'file_paused')
+    assert other_transfer.last_activity == other_activity
+    for client in (alice, bobby, carol):
+        assert not received(client, 'file_chunk')
+    transfer = manager.get_transfer(created['transferId'])
+    assert transfer.paused
+    assert transfer.next_chunk == 0
+
+
+def test_expiry_notifies_connected_sides(socketio, connect):
+    alice, bobby = connect('alice'), connect('bobby')
+    created, _ = start_transfer(alice, bobby, 'bobby')
+    fresh, _ = start_transfer(bobby, alice, 'alice')
+    transfer = handlers.transfer_manager.get_transfer(created['transferId'])
+    transfer.last_activity = datetime.utcnow() - timedelta(seconds=601)
+
+    assert expire_stale_transfers(socketio, handlers.transfer_manager, max_idle_time=600) == [transfer]
+    expected = [{'transferId': created['transferId'], 'from': None, 'reason': 'expired'}]
+    assert received(alice, 'file_cancelled') == expected
+    assert received(bobby, 'file_cancelled') == expected
+    assert handlers.transfer_manager.get_transfer(fresh['transferId']) is not None
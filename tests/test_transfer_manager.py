@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.transfer_manager import (
+    MAX_FILE_SIZE,
+    MAX_INCOMING_TRANSFERS_PER_USER,
+    WINDOW_SIZE,
+    TransferError,
+    TransferManager,
+)
+
+
+@pytest.fixture
+def manager():
+    return TransferManager()
+
+
+def accepted_transfer(manager, size=10, chunk_size=4):
+    transfer = manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'file.bin', size,
+                                       chunk_size=chunk_size)
+    manager.accept_transfer(transfer.transfer_id, 'sid-b')
+    return transfer
+
+
+def test_create_rejects_invalid_offers(manager):
+    with pytest.raises(TransferError):
+        manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'f', MAX_FILE_SIZE + 1)
+    with pytest.raises(TransferError):
+        manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'f', True)
+    with pytest.raises(TransferError):
+        manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'f', 10, chunk_size=True)
+    with pytest.raises(TransferError):
+        manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', {'name': 'f'}, 10)
+    with pytest.raises(TransferError):
+        manager.create_transfer('alice', 'sid-a', 'alice', 'sid-a', 'f', 10)
+
+
+def test_create_caps_incoming_transfers(manager):
+    for i in range(MAX_INCOMING_TRANSFERS_PER_USER):
+        manager.create_transfer(f'user{i}', f'sid-{i}', 'bobby', 'sid-b', 'f', 10)
+    with pytest.raises(TransferError):
+        manager.create_transfer('other', 'sid-o', 'bobby', 'sid-b', 'f', 10)
+
+
+def test_chunks_require_acceptance(manager):
+    transfer = manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'f', 10, chunk_size=4)
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+
+
+def test_chunks_accepted_in_any_order_within_window(manager):
+    transfer = accepted_transfer(manager)
+    for index in (True, 0.0, -1, 3):
+        with pytest.raises(TransferError):
+            manager.reserve_chunk(transfer.transfer_id, 'sid-a', index, 4)
+
+    # Concurrent handlers may reserve chunk 1 before chunk 0
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    assert transfer.in_flight == 2
+
+
+def test_duplicate_chunk_rejected_after_ack(manager):
+    transfer = accepted_transfer(manager)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 0)
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+
+
+def test_only_sender_can_send_chunks(manager):
+    transfer = accepted_transfer(manager)
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-b', 0, 4)
+
+
+def test_window_full_rejected(manager):
+    transfer = accepted_transfer(manager, size=4 * (WINDOW_SIZE + 2))
+    for index in range(1, WINDOW_SIZE):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', index, 4)
+    # Chunk 0 is still unsent, but the window is anchored at the last acknowledgement
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', WINDOW_SIZE, 4)
+
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 0)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', WINDOW_SIZE, 4)
+
+
+def test_last_chunk_length(manager):
+    transfer = accepted_transfer(manager)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', 2, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 2, 2)
+
+
+def test_invalid_acknowledgements_rejected(manager):
+    transfer = accepted_transfer(manager)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 2, 2)
+    # Chunk 1 has not been relayed, so a cumulative ack for chunk 2 is invalid
+    for index in (1, 2, False, 0.0):
+        with pytest.raises(TransferError):
+            manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', index)
+    with pytest.raises(TransferError):
+        manager.acknowledge_chunk(transfer.transfer_id, 'sid-a', 0)
+
+    manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 0)
+    assert transfer.acked_chunks == 1
+    assert transfer.reserved_chunks == {2}
+
+
+def test_completed_transfer_removed(manager):
+    transfer = accepted_transfer(manager)
+    for index, length in enumerate((4, 4, 2)):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', index, length)
+
+    result = manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 2)
+    assert result.is_complete
+    assert manager.get_transfer(transfer.transfer_id) is None
+
+
+def test_disconnect_pauses_and_rewinds(manager):
+    transfer = accepted_transfer(manager)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+    manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 0)
+
+    assert manager.pause_user_transfers('sid-b') == [transfer]
+    assert transfer.paused
+    assert transfer.recipient_sid is None
+    assert transfer.next_chunk == transfer.acked_chunks == 1
+    with pytest.raises(TransferError):
+        manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+
+
+def test_disconnect_drops_unaccepted_offers(manager):
+    transfer = manager.create_transfer('alice', 'sid-a', 'bobby', 'sid-b', 'f', 10)
+    manager.pause_user_transfers('sid-a')
+    assert manager.get_transfer(transfer.transfer_id) is None
+
+
+def test_resume_rewinds_to_acked_chunks(manager):
+    transfer = accepted_transfer(manager)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 0, 4)
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+    manager.acknowledge_chunk(transfer.transfer_id, 'sid-b', 0)
+
+    manager.resume_transfer(transfer.transfer_id, 'sid-a', 'alice', transfer.sender_token)
+    assert not transfer.paused
+    assert transfer.next_chunk == transfer.acked_chunks == 1
+    manager.reserve_chunk(transfer.transfer_id, 'sid-a', 1, 4)
+
+
+def test_resume_requires_token(manager):
+    transfer = accepted_transfer(manager)
+    manager.pause_user_transfers('sid-b')
+
+    # Someone reusing the departed nickname cannot reclaim the transfer
+    with pytest.raises(TransferError):
+        manager.resume_transfer(transfer.transfer_id, 'sid-x', 'bobby', None)
+    with pytest.raises(TransferError):
+        manager.resume_transfer(transfer.transfer_id, 'sid-x', 'bobby', 'guess')
+    with pytest.raises(TransferError):
+        manager.cancel_transfer(transfer.transfer_id, 'sid-x')
+
+    manager.resume_transfer(transfer.transfer_id, 'sid-b2', 'bobby', transfer.recipient_token)
+    assert transfer.recipient_sid == 'sid-b2'
+    assert not transfer.paused
+
+
+def test_resume_waits_for_both_sides(manager):
+    transfer = accepted_transfer(manager)
+    manager.pause_user_transfers('sid-a')
+    manager.pause_user_transfers('sid-b')
+
+    manager.resume_transfer(transfer.transfer_id, 'sid-a2', 'alice', transfer.sender_token)
+    assert transfer.paused
+    manager.resume_transfer(transfer.transfer_id, 'sid-b2', 'bobby', transfer.recipient_token)
+    assert not transfer.paused
+
+
+def test_cleanup_removes_idle_transfers(manager):
+    transfer = accepted_transfer(manager)
+    fresh = manager.create_transfer('carol', 'sid-c', 'bobby', 'sid-b', 'f', 10)
+    transfer.last_activity = datetime.utcnow() - timedelta(seconds=601)
+
+    assert manager.cleanup_stale_transfers() == [transfer]
+    assert manager.get_transfer(transfer.transfer_id) is None
+    assert manager.get_transfer(fresh.transfer_id) is fresh
+
+
+def test_bound_side_can_cancel_paused_transfer(manager):
+    transfer = accepted_transfer(manager)
+    manager.pause_user_transfers('sid-b')
+
+    assert manager.cancel_transfer(transfer.transfer_id, 'sid-a') is transfer
+    assert manager.get_transfer(transfer.transfer_id) is None
+
+
+def test_departed_side_cancels_with_token(manager):
+    transfer = accepted_transfer(manager)
+    manager.pause_user_transfers('sid-b')
+
+    manager.cancel_transfer(transfer.transfer_id, 'sid-b2', transfer.recipient_token)
+    assert manager.get_transfer(transfer.transfer_id) is None